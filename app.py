@@ -1,9 +1,22 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import aiohttp
+import asyncio
+import json
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+from cachetools import TTLCache
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
 import logging
-from requests_html import HTMLSession
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from playwright.sync_api import sync_playwright
 
 app = Flask(__name__)
 CORS(app)
@@ -16,87 +29,328 @@ HEADERS = {
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
         'AppleWebKit/537.36 (KHTML, like Gecko) '
         'Chrome/91.0.4472.124 Safari/537.36'
-    )
+    ),
+    'Accept': 'text/html,application/xhtml+xml',
+    # Brotli is decoded transparently by aiohttp and urllib3 once installed
+    'Accept-Encoding': 'gzip, deflate, br'
 }
 
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# Upper bound on how much of a page the static scraper downloads
+MAX_PAGE_BYTES = 1024 * 1024
+
+# Shared pool for HTML parsing so it doesn't block the event loop
+PARSE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Only build soup nodes for the tags the static scraper reads. Every tag that
+# PRICE_SELECTORS and DESC_SELECTORS can match must be listed here
+STATIC_STRAINER = SoupStrainer(['h1', 'title', 'meta', 'ul', 'ol', 'li'])
+
+# Product metadata most shops publish for search engines and link previews
+PRICE_SELECTORS = [
+    'meta[itemprop="price"]',
+    'meta[property="product:price:amount"]',
+    'meta[property="og:price:amount"]'
+]
+DESC_SELECTORS = [
+    'meta[property="og:description"]',
+    'meta[itemprop="description"]'
+]
+
+# Shared session so repeated hits on the same host reuse keep-alive connections.
+# Only failed connects are retried: its one caller is the JSON-LD probe, which
+# falls back to rendering anyway, so retrying bot-block 429/503s just adds delay
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, read=False, backoff_factor=0.3)
+)
+
+# (connect, read) timeout for the JSON-LD probe, kept short since a render follows on failure
+PROBE_TIMEOUT = (3.05, 5)
+SESSION.mount('https://', adapter)
+SESSION.mount('http://', adapter)
+
+# Parsed features per URL; product pages rarely change within a few minutes
+SCRAPE_CACHE = TTLCache(maxsize=512, ttl=600)
+cache_lock = threading.Lock()
+
 def is_valid_url(url):
     return url.startswith(('http://', 'https://'))
 
+KEY_MAPPING = {
+    'memory': 'RAM',
+    'ram': 'RAM',
+    'internal storage': 'Storage',
+    'storage': 'Storage',
+    'battery capacity': 'Battery',
+    'battery': 'Battery',
+    'camera': 'Camera',
+    'main camera': 'Camera',
+    'display': 'Display',
+    'screen size': 'Display',
+    'price': 'Price',
+    'product': 'Product'
+}
+
 def normalize_key(key):
     key = key.lower().strip()
-    mapping = {
-        'memory': 'RAM',
-        'ram': 'RAM',
-        'internal storage': 'Storage',
-        'storage': 'Storage',
-        'battery capacity': 'Battery',
-        'battery': 'Battery',
-        'camera': 'Camera',
-        'main camera': 'Camera',
-        'display': 'Display',
-        'screen size': 'Display',
-        'price': 'Price',
-        'product': 'Product'
-    }
-    for k in mapping:
+    for k, v in KEY_MAPPING.items():
         if k in key:
-            return mapping[k]
+            return v
     return key.title()
 
-def scrape_dynamic_features(url):
+# Playwright's sync API is bound to the thread that started it, so each
+# render thread keeps its own long-lived browser. Renders run on a
+# dedicated pool because Flask gives every async request a fresh default
+# executor, whose threads would each launch (and leak) a new browser. The
+# pool is kept small since each Chromium instance is well over 200 MB
+_browsers = threading.local()
+
+MAX_RENDERS = 4
+RENDER_POOL = ThreadPoolExecutor(max_workers=MAX_RENDERS, thread_name_prefix='render')
+
+BLOCKED_RESOURCES = ('image', 'font', 'media')
+
+def get_browser():
+    browser = getattr(_browsers, 'browser', None)
+    if browser is not None and browser.is_connected():
+        return browser
+
+    if browser is not None:
+        # The browser crashed or was closed; shut its driver down before relaunching
+        logger.warning("Browser disconnected, relaunching")
+        _browsers.browser = None
+        try:
+            _browsers.playwright.stop()
+        except Exception as e:
+            logger.warning("Error stopping Playwright: %s", e)
+
+    # A driver left running after a failed launch would stay attached to this
+    # thread and break every later start on it
+    playwright = sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True, args=['--disable-extensions'])
+    except Exception:
+        playwright.stop()
+        raise
+
+    _browsers.playwright = playwright
+    _browsers.browser = browser
+    return browser
+
+def block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+def render_page(url):
+    context = get_browser().new_context(user_agent=HEADERS['User-Agent'])
     try:
-        logger.info(f"Scraping with requests-html: {url}")
-        session = HTMLSession()
-        r = session.get(url)
-        r.html.render(timeout=20)
-
-        data = {}
-
-        if 'amazon' in url:
-            title = r.html.find('#productTitle', first=True)
-            price = r.html.find('.a-price .a-offscreen', first=True)
-            specs = r.html.find('#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr')
-
-            data['Product'] = title.text.strip() if title else 'N/A'
-            data['Price'] = price.text.strip() if price else 'N/A'
-
-            for spec in specs:
-                key_el = spec.find('th', first=True)
-                val_el = spec.find('td', first=True)
-                if key_el and val_el:
-                    key = normalize_key(key_el.text.strip())
-                    val = val_el.text.strip()
-                    data[key] = val
-
-        elif 'flipkart' in url:
-            title = r.html.find('span.B_NuCI', first=True)
-            price = r.html.find('div._30jeq3._16Jk6d', first=True)
-            specs = r.html.find('div._1UhVsV > div')
-
-            data['Product'] = title.text.strip() if title else 'N/A'
-            data['Price'] = price.text.strip() if price else 'N/A'
-
-            for section in specs:
-                rows = section.find('tr')
-                for row in rows:
-                    cells = row.find('td')
-                    if len(cells) == 2:
-                        key = normalize_key(cells[0].text.strip())
-                        val = cells[1].text.strip()
-                        data[key] = val
+        page = context.new_page()
+        page.route('**/*', block_heavy_resources)
+        page.goto(url, wait_until='domcontentloaded', timeout=20000)
+        return page.content()
+    finally:
+        context.close()
+
+# lxml parsers can't be shared between threads, so each thread reuses its own.
+# Call this on PARSE_POOL: its threads outlive requests, unlike the per-request
+# executors behind asyncio.to_thread, so the cached parser actually gets reused
+_parsers = threading.local()
+
+def parse_html(content):
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = lxml.html.HTMLParser(recover=True, remove_comments=True, huge_tree=False)
+        _parsers.parser = parser
+    return lxml.html.fromstring(content, parser=parser)
+
+# Compiled once at import instead of re-parsing the selector on every scrape
+SEL_AMZ_TITLE = CSSSelector('#productTitle')
+SEL_AMZ_PRICE = CSSSelector('.a-price .a-offscreen')
+# Only rows that have both a key and a value cell, in a single traversal
+XPATH_AMZ_SPEC_ROWS = etree.XPath(
+    "//*[@id='productDetails_techSpec_section_1' or @id='productDetails_detailBullets_sections1']"
+    "//tr[th and td]"
+)
+SEL_FK_TITLE = CSSSelector('span.B_NuCI')
+SEL_FK_PRICE = CSSSelector('div._30jeq3._16Jk6d')
+SEL_FK_SPECS = CSSSelector('div._1UhVsV > div')
+SEL_LD_JSON = CSSSelector('script[type="application/ld+json"]')
+
+def select_text(selector, tree):
+    found = selector(tree)
+    return found[0].text_content().strip() if found else 'N/A'
+
+def find_ld_product(payload):
+    if isinstance(payload, dict):
+        payload = payload.get('@graph', [payload])
+    if not isinstance(payload, list):
+        return None
+    for item in payload:
+        if not isinstance(item, dict):
+            continue
+        types = item.get('@type')
+        if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+            return item
+    return None
+
+def fetch_limited(url, limit=MAX_PAGE_BYTES):
+    with SESSION.get(url, timeout=PROBE_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                logger.info("Stopped reading %s after %d bytes", url, size)
+                break
+        return b''.join(chunks)
+
+def scrape_structured_data(url):
+    # Many product pages embed schema.org JSON-LD in the static HTML, which
+    # saves a full browser render when it carries the spec properties
+    try:
+        content = fetch_limited(url)
+    except requests.RequestException as e:
+        logger.info("Static fetch failed for %s, falling back to rendering: %s", url, e)
+        return None
+
+    return PARSE_POOL.submit(extract_structured_data, url, content).result()
 
+def extract_structured_data(url, content):
+    try:
+        tree = parse_html(content)
+    except etree.ParserError as e:
+        logger.info("Empty or unparsable page for %s, falling back to rendering: %s", url, e)
+        return None
+
+    for script in SEL_LD_JSON(tree):
+        try:
+            product = find_ld_product(json.loads(script.text or ''))
+        except ValueError:
+            continue
+        if not product:
+            continue
+
+        data = {'Product': product.get('name') or 'N/A'}
+
+        offers = product.get('offers') or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        price = offers.get('price', offers.get('lowPrice')) if isinstance(offers, dict) else None
+        if price is not None:
+            data['Price'] = f"{offers.get('priceCurrency', '')} {price}".strip()
         else:
-            return {'error': 'Unsupported platform'}
+            data['Price'] = 'N/A'
+
+        props = product.get('additionalProperty') or []
+        if isinstance(props, dict):
+            props = [props]
+        for prop in props:
+            if isinstance(prop, dict) and prop.get('name') and prop.get('value') is not None:
+                data[normalize_key(str(prop['name']))] = str(prop['value'])
 
-        logger.info(f"Scraped {len(data)} features from {url}")
+        return data
+
+    return None
+
+def extract_amazon(tree):
+    data = {}
+    data['Product'] = select_text(SEL_AMZ_TITLE, tree)
+    data['Price'] = select_text(SEL_AMZ_PRICE, tree)
+
+    for row in XPATH_AMZ_SPEC_ROWS(tree):
+        key = normalize_key(row.find('th').text_content().strip())
+        data[key] = row.find('td').text_content().strip()
+    return data
+
+def extract_flipkart(tree):
+    data = {}
+    data['Product'] = select_text(SEL_FK_TITLE, tree)
+    data['Price'] = select_text(SEL_FK_PRICE, tree)
+
+    for section in SEL_FK_SPECS(tree):
+        for row in section.iter('tr'):
+            cells = row.findall('td')
+            if len(cells) == 2:
+                key = normalize_key(cells[0].text_content().strip())
+                val = cells[1].text_content().strip()
+                data[key] = val
+    return data
+
+# Keyed on a label of the URL's host name, so a path or query that merely
+# mentions a retailer doesn't trigger a browser render
+DYNAMIC_EXTRACTORS = {
+    'amazon': extract_amazon,
+    'flipkart': extract_flipkart
+}
+
+def find_extractor(url):
+    try:
+        host = urlparse(url).hostname or ''
+    except ValueError:
+        # Malformed URLs fall through to the static scraper, which reports the fetch error
+        return None
+    for label in host.split('.'):
+        extractor = DYNAMIC_EXTRACTORS.get(label)
+        if extractor:
+            return extractor
+    return None
+
+def extract_rendered(extractor, html):
+    return extractor(parse_html(html))
+
+def scrape_dynamic_features(url, extractor):
+    try:
+        embedded = scrape_structured_data(url) or {}
+        # A Product with only name and offers has no specs, so still render
+        if set(embedded) - {'Product', 'Price'}:
+            logger.info("Scraped %d features from embedded JSON-LD: %s", len(embedded), url)
+            return embedded
+
+        logger.info("Scraping with Playwright: %s", url)
+        html = RENDER_POOL.submit(render_page, url).result()
+        data = PARSE_POOL.submit(extract_rendered, extractor, html).result()
+
+        for key, value in embedded.items():
+            if data.get(key, 'N/A') == 'N/A':
+                data[key] = value
+
+        logger.info("Scraped %d features from %s", len(data), url)
         return data
 
     except Exception as e:
-        logger.error(f"Scraping error: {e}")
+        logger.error("Scraping error: %s", e)
         return {'error': f'Error scraping {url}: {str(e)}'}
 
+async def scrape_async(session, url):
+    with cache_lock:
+        cached = SCRAPE_CACHE.get(url)
+    if cached is not None:
+        logger.info("Cache hit: %s", url)
+        return cached
+
+    # The dynamic scraper is blocking, so keep it off the event loop
+    extractor = find_extractor(url)
+    if extractor:
+        result = await asyncio.to_thread(scrape_dynamic_features, url, extractor)
+    else:
+        result = await scrape_features_async(session, url)
+
+    if 'error' not in result:
+        with cache_lock:
+            SCRAPE_CACHE[url] = result
+    return result
+
 @app.route('/compare', methods=['POST'])
-def compare():
+async def compare():
     data = request.get_json()
     if not data:
         return jsonify({'error': 'Missing JSON payload'}), 400
@@ -107,9 +361,13 @@ def compare():
     if not (is_valid_url(url1) and is_valid_url(url2)):
         return jsonify({'error': 'URLs must start with http:// or https://'}), 400
 
-    logger.info(f"Comparing: {url1} vs {url2}")
-    result1 = scrape_dynamic_features(url1) if 'amazon' in url1 or 'flipkart' in url1 else scrape_features(url1)
-    result2 = scrape_dynamic_features(url2) if 'amazon' in url2 or 'flipkart' in url2 else scrape_features(url2)
+    logger.info("Comparing: %s vs %s", url1, url2)
+    connector = aiohttp.TCPConnector(limit=64, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        result1, result2 = await asyncio.gather(
+            scrape_async(session, url1),
+            scrape_async(session, url2),
+        )
 
     if 'error' in result1:
         return jsonify({'error': result1['error']}), 400
@@ -133,103 +391,96 @@ def home():
         }
     })
 
-def scrape_features(url):
+async def read_limited(response, limit=MAX_PAGE_BYTES):
+    # Title, meta tags, headline and the first lists sit near the top of the
+    # page, so stop reading oversized pages instead of pulling the whole body
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(65536):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            logger.info("Stopped reading %s after %d bytes", response.url, size)
+            break
+    return b''.join(chunks)
+
+def extract_text(soup, selectors, label):
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if not element:
+            continue
+        text = element.get('content', '') if element.name == 'meta' else element.get_text()
+        if isinstance(text, str) and text.strip():
+            logger.debug("Found %s via %s", label, selector)
+            return text.strip()
+    return None
+
+def extract_features(url, content):
+    soup = BeautifulSoup(content, 'lxml', parse_only=STATIC_STRAINER)
+
+    features = {}
+
+    # Title
+    title = soup.find('h1')
+    if title:
+        features['Product'] = title.get_text(strip=True)
+
+    # Price
+    price = extract_text(soup, PRICE_SELECTORS, 'Price')
+    if price:
+        features['Price'] = price
+
+    # Description
+    description = extract_text(soup, DESC_SELECTORS, 'Description')
+    if not description:
+        meta = soup.find('meta', attrs={'name': 'description'})
+        meta_content = meta.get('content', '') if meta else None
+        if isinstance(meta_content, str):
+            description = meta_content[:200] + "..."
+        else:
+            description = "No description found"
+    features['Description'] = description
+
+    # Feature lists
+    if len(features) <= 1:
+        import bs4
+        for i, ul in enumerate(soup.find_all(['ul', 'ol'])[:3]):
+            if isinstance(ul, bs4.element.Tag):
+                items = [li.get_text(strip=True) for li in ul.find_all('li')[:5]]
+                if items:
+                    features[f'Feature List {i+1}'] = ', '.join(items)
+
+    # Fallback
+    if not features:
+        page_title = soup.find('title')
+        features = {
+            'Title': page_title.get_text(strip=True) if page_title else 'No title found',
+            'URL': url,
+            'Content Length': f"{len(content)} bytes"
+        }
+
+    return features
+
+async def scrape_features_async(session, url):
     try:
-        logger.info(f"Scraping: {url}")
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        features = {}
-
-        # Title
-        title = soup.find('h1')
-        if title:
-            features['Product'] = title.get_text(strip=True)
-
-        # Price
-        price = extract_text(soup, PRICE_SELECTORS, 'Price')
-        if price:
-            features['Price'] = price
-
-        # Description
-        description = extract_text(soup, DESC_SELECTORS, 'Description')
-        if not description:
-            meta = soup.find('meta', attrs={'name': 'description'})
-            content = meta.get('content', '') if meta else None
-            if isinstance(content, str):
-                description = content[:200] + "..."
-            else:
-                description = "No description found"
-        features['Description'] = description
-
-        # Feature lists
-        if len(features) <= 1:
-            import bs4
-            for i, ul in enumerate(soup.find_all(['ul', 'ol'])[:3]):
-                if isinstance(ul, bs4.element.Tag):
-                    items = [li.get_text(strip=True) for li in ul.find_all('li')[:5]]
-                    if items:
-                        features[f'Feature List {i+1}'] = ', '.join(items)
-
-        # Fallback
-        if not features:
-            page_title = soup.find('title')
-            features = {
-                'Title': page_title.get_text(strip=True) if page_title else 'No title found',
-                'URL': url,
-                'Content Length': f"{len(response.content)} bytes"
-            }
-
-        logger.info(f"Scraped {len(features)} features from {url}")
+        logger.info("Scraping: %s", url)
+        async with session.get(url, timeout=FETCH_TIMEOUT) as response:
+            response.raise_for_status()
+            content = await read_limited(response)
+
+        loop = asyncio.get_running_loop()
+        features = await loop.run_in_executor(PARSE_POOL, extract_features, url, content)
+
+        logger.info("Scraped %d features from %s", len(features), url)
         return features
 
-    except requests.RequestException as e:
-        logger.error(f"Request error: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Request error: %s", e)
         return {'error': f'Failed to fetch {url}: {str(e)}'}
     except Exception as e:
-        logger.error(f"Scraping error: {e}")
+        logger.error("Scraping error: %s", e)
         return {'error': f'Error scraping {url}: {str(e)}'}
 
-@app.route('/compare', methods=['POST'])
-def compare():
-    data = request.get_json()
-    if not data:
-        return jsonify({'error': 'Missing JSON payload'}), 400
-
-    url1, url2 = data.get('url1'), data.get('url2')
-    if not (url1 and url2):
-        return jsonify({'error': 'Both URLs are required'}), 400
-    if not (is_valid_url(url1) and is_valid_url(url2)):
-        return jsonify({'error': 'URLs must start with http:// or https://'}), 400
-
-    logger.info(f"Comparing: {url1} vs {url2}")
-    result1, result2 = scrape_features(url1), scrape_features(url2)
-
-    if 'error' in result1:
-        return jsonify({'error': result1['error']}), 400
-    if 'error' in result2:
-        return jsonify({'error': result2['error']}), 400
-
-    return jsonify({'data1': result1, 'data2': result2})
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    return jsonify({'status': 'healthy', 'message': 'API is running'})
-
-@app.route('/', methods=['GET'])
-def home():
-    return jsonify({
-        'name': 'Universal Feature Comparator API',
-        'version': '1.1.0',
-        'endpoints': {
-            '/compare': 'POST - Compare features from two URLs',
-            '/health': 'GET - Health check'
-        }
-    })
-
-
-
 @app.route('/meta')
 def meta():
     return jsonify({